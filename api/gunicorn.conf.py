@@ -0,0 +1,29 @@
+"""
+Gunicorn yapılandırması
+
+Uygulama master süreçte bir kez yüklenir (preload_app) ve worker'lar fork ile
+oluşturulur; böylece her worker import maliyetini tekrar ödemez. Veritabanı ve
+broker bağlantıları fork sonrasında, her worker içinde ilk kullanımda açılır.
+"""
+import os
+import time
+
+bind = '0.0.0.0:5000'
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+timeout = 120
+preload_app = True
+
+_master_started = time.monotonic()
+
+
+def when_ready(server):
+    server.log.info("Master ready in %.1f ms", (time.monotonic() - _master_started) * 1000)
+
+
+def post_fork(server, worker):
+    # Master'da açılmış olabilecek bağlantıları worker'lar paylaşmasın
+    from app import app
+    from model import db
+    with app.app_context():
+        db.engine.dispose(close=False)
+    server.log.info("Worker %s forked in %.1f ms after master start", worker.pid, (time.monotonic() - _master_started) * 1000)
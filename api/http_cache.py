@@ -0,0 +1,104 @@
+"""
+Tamamlanmış görev sonuçları için HTTP önbellekleme
+
+SUCCESS veya FAILURE durumuna ulaşan bir görevin sonucu bir daha değişmez. Bu
+yanıtlar güçlü ETag ve uzun Cache-Control başlıklarıyla döndürülür; gövde gzip
+ile sıkıştırılmış olarak süreç içi bir LRU önbellekte tutulur. Önbellekteki bir
+görev için gelen istekler (If-None-Match ile gelenler 304 olarak) veritabanına
+gidilmeden ve JSON yeniden üretilmeden yanıtlanır. nginx de aynı başlıklara göre
+yanıtları önbelleğe alır (viteTailMui/nginx.conf).
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response, current_app, request
+
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 512))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+RESULT_CACHE_MAX_AGE = int(os.environ.get('RESULT_CACHE_MAX_AGE', 365 * 24 * 3600))
+IMMUTABLE_CACHE_CONTROL = f'public, max-age={RESULT_CACHE_MAX_AGE}, immutable'
+
+
+class ResponseCache:
+    """
+    Eleman sayısı ve toplam boyutu sınırlı LRU önbellek: anahtar -> (etag, gzip gövde)
+    """
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, etag, body):
+        # Tek başına önbelleğin büyük kısmını kaplayacak gövdeler tutulmaz
+        if len(body) > self.max_bytes // 8:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self.size -= len(previous[1])
+            self._entries[key] = (etag, body)
+            self.size += len(body)
+            while len(self._entries) > self.maxsize or self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+result_cache = ResponseCache()
+
+
+def _respond(etag, compressed):
+    # Sıkıştırılmış ve sıkıştırılmamış gövde farklı temsillerdir; güçlü ETag'leri de farklıdır
+    gzip_etag = f'{etag}-gzip'
+    if request.if_none_match.contains_weak(etag) or request.if_none_match.contains_weak(gzip_etag):
+        response = Response(status=304)
+        response.set_etag(gzip_etag if request.if_none_match.contains_weak(gzip_etag) else etag)
+    elif request.accept_encodings['gzip']:
+        response = Response(compressed, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(gzip_etag)
+    else:
+        response = Response(gzip.decompress(compressed), mimetype='application/json')
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def cached_response(key):
+    """
+    Anahtar önbellekteyse yanıtı döndürür, değilse None
+    """
+    entry = result_cache.get(key)
+    return _respond(*entry) if entry else None
+
+
+def immutable_response(key, payload):
+    """
+    Artık değişmeyecek bir yanıtı serileştirir, önbelleğe ekler ve döndürür
+    """
+    body = current_app.json.dumps(payload).encode('utf-8')
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    compressed = gzip.compress(body, compresslevel=6)
+    result_cache.put(key, etag, compressed)
+    return _respond(etag, compressed)
+
+
+def no_store(response):
+    """
+    Henüz tamamlanmamış görevlerin yanıtları (durum sorgulaması) önbelleğe alınmaz
+    """
+    response.headers['Cache-Control'] = 'no-store'
+    return response
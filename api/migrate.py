@@ -0,0 +1,41 @@
+"""
+Veritabanı şemasını oluşturur ve günceller (bkz. model.SCHEMA_UPGRADES)
+
+API container'ları başlamadan önce bir kez çalıştırılır:
+    python migrate.py
+"""
+import sys
+import time
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from model import init_app, upgrade_schema
+
+MAX_ATTEMPTS = 30
+
+
+def main():
+    started = time.monotonic()
+    app = Flask(__name__)
+    init_app(app)
+
+    with app.app_context():
+        # Postgres container'ı henüz hazır olmayabilir
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                upgrade_schema()
+                break
+            except OperationalError as e:
+                if attempt == MAX_ATTEMPTS:
+                    print(f"Migration failed: {e}")
+                    return 1
+                print(f"Database not ready (attempt {attempt}/{MAX_ATTEMPTS}), retrying...")
+                time.sleep(2)
+
+    print(f"Migration completed in {round((time.monotonic() - started) * 1000, 1)} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from datetime import datetime, timedelta, timezone
 import os
 
 db = SQLAlchemy()
 
+def _local_now():
+    # Varsayılan değer her kayıt eklenirken hesaplanmalı; modül yüklenirken
+    # hesaplanan sabit bir değer tüm kayıtlara aynı zamanı yazar
+    return datetime.now() + timedelta(hours=3)
+
 def init_app(app):
     """
     Flask uygulamasına SQLAlchemy'yi yapılandırır ve bağlar
@@ -15,19 +21,88 @@ def init_app(app):
     # SQLAlchemy'yi uygulama ile ilişkilendir
     db.init_app(app)
 
+# create_all mevcut tablolara yeni kolon eklemez; sonradan eklenen kolon ve
+# indeksler burada idempotent DDL olarak tutulur
+SCHEMA_UPGRADES = [
+    # tasks.parameters / tasks.result: json -> jsonb (yalnızca hâlâ json ise yeniden yazılır)
+    """DO $$ BEGIN
+        IF (SELECT data_type FROM information_schema.columns WHERE table_name = 'tasks' AND column_name = 'parameters') = 'json' THEN
+            ALTER TABLE tasks ALTER COLUMN parameters TYPE JSONB USING parameters::jsonb;
+        END IF;
+        IF (SELECT data_type FROM information_schema.columns WHERE table_name = 'tasks' AND column_name = 'result') = 'json' THEN
+            ALTER TABLE tasks ALTER COLUMN result TYPE JSONB USING result::jsonb;
+        END IF;
+    END $$""",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS wall_time DOUBLE PRECISION",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS cpu_time DOUBLE PRECISION",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS max_rss_kb INTEGER",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS stdout_bytes BIGINT",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS stderr_bytes BIGINT",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS container_cpu_time DOUBLE PRECISION",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS parent_id VARCHAR(36)",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_parent_id ON tasks (parent_id)",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_parameters ON tasks USING gin (parameters jsonb_path_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_target_key ON tasks ((parameters ->> 'target_key'))",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS crawl_output TEXT",
+    "ALTER TABLE crawl_results ADD COLUMN IF NOT EXISTS search_vector TSVECTOR",
+    "ALTER TABLE nmap_results ADD COLUMN IF NOT EXISTS search_vector TSVECTOR",
+    "ALTER TABLE whois_results ADD COLUMN IF NOT EXISTS search_vector TSVECTOR",
+    "CREATE INDEX IF NOT EXISTS ix_crawl_results_search_vector ON crawl_results USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_nmap_results_search_vector ON nmap_results USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_whois_results_search_vector ON whois_results USING gin (search_vector)",
+    # owner_ids'i olmayan eski zamanlanmış çalıştırmaların sahiplerini schedule_runs'tan doldur
+    """UPDATE tasks SET parameters = tasks.parameters || jsonb_build_object('owner_ids', owners.user_ids)
+        FROM (SELECT r.task_id, jsonb_agg(DISTINCT s.user_id) AS user_ids
+              FROM schedule_runs r JOIN scan_schedules s ON s.id = r.schedule_id
+              GROUP BY r.task_id) AS owners
+        WHERE tasks.id = owners.task_id AND NOT (tasks.parameters ? 'owner_ids')""",
+    # Eski kayıtlar için arama vektörlerini doldur
+    "UPDATE nmap_results SET search_vector = to_tsvector('simple', left(coalesce(scan_result, ''), 500000)) WHERE search_vector IS NULL",
+    "UPDATE whois_results SET search_vector = to_tsvector('simple', left(coalesce(whois_data, ''), 500000)) WHERE search_vector IS NULL",
+]
+
+def upgrade_schema():
+    """
+    Tabloları oluşturur ve SCHEMA_UPGRADES içindeki DDL'leri uygular
+    """
+    from sqlalchemy import text
+    db.create_all()
+    # Aynı anda açılan gunicorn worker'ları DDL'leri sırayla çalıştırsın
+    db.session.execute(text("SELECT pg_advisory_xact_lock(hashtext('cyberlens_schema'))"))
+    for statement in SCHEMA_UPGRADES:
+        db.session.execute(text(statement))
+    db.session.commit()
+
 class Task(db.Model):
     __tablename__ = 'tasks'
     
     id = db.Column(db.String(36), primary_key=True)  # Celery task ID'si
     task_type = db.Column(db.String(50), nullable=False)  # Görev tipi (add_numbers, run_command)
     status = db.Column(db.String(20), nullable=False)  # SUCCESS, PENDING, FAILURE
-    created_at = db.Column(db.DateTime, default=datetime.now() + timedelta(hours=3))
+    created_at = db.Column(db.DateTime, default=_local_now)
     completed_at = db.Column(db.DateTime, nullable=True)
     user_id = db.Column(db.String(64),nullable=True)
+    # Pipeline'a ait alt görevlerde üst (pipeline) görevin ID'si
+    parent_id = db.Column(db.String(36), nullable=True, index=True)
    
-    # Görev parametreleri ve sonuçları JSON olarak saklanır
-    parameters = db.Column(db.JSON, nullable=True)
-    result = db.Column(db.JSON, nullable=True)
+    # Araç alt süreçlerinin kaynak kullanımı (bkz. worker/resources.py)
+    wall_time = db.Column(db.Float, nullable=True)  # saniye
+    cpu_time = db.Column(db.Float, nullable=True)  # aracın user+sys CPU süresi, saniye (ölçülemezse NULL)
+    max_rss_kb = db.Column(db.Integer, nullable=True)  # yalnızca yerel araçlarda; docker exec'te NULL
+    stdout_bytes = db.Column(db.BigInteger, nullable=True)
+    stderr_bytes = db.Column(db.BigInteger, nullable=True)
+    container_cpu_time = db.Column(db.Float, nullable=True)  # hedef container'ın CPU artışı (eşzamanlı işler dahil)
+
+    # Görev parametreleri ve sonuçları JSONB olarak saklanır (indekslenebilir)
+    parameters = db.Column(JSONB, nullable=True)
+    result = db.Column(JSONB, nullable=True)
+
+    __table_args__ = (
+        # parameters @> '{...}' sorguları için
+        db.Index('ix_tasks_parameters', 'parameters', postgresql_using='gin', postgresql_ops={'parameters': 'jsonb_path_ops'}),
+        # Kanonik hedef anahtarı ile arama (bkz. api/targets.py)
+        db.Index('ix_tasks_target_key', db.text("(parameters ->> 'target_key')")),
+    )
     
     def __repr__(self):
         return f"<Task {self.id} ({self.task_type}): {self.status}>"
@@ -42,8 +117,25 @@ class Task(db.Model):
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'parent_id': self.parent_id,
             'parameters': self.parameters,
-            'result': self.result
+            'result': self.result,
+            'resource_usage': self.resource_usage()
+        }
+
+    def resource_usage(self):
+        """
+        Görevin kaynak kullanımını döndürür; ölçülmemişse None
+        """
+        if self.wall_time is None:
+            return None
+        return {
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'max_rss_kb': self.max_rss_kb,
+            'stdout_bytes': self.stdout_bytes,
+            'stderr_bytes': self.stderr_bytes,
+            'container_cpu_time': self.container_cpu_time
         }
 
 class CrawlResult(db.Model):
@@ -52,9 +144,15 @@ class CrawlResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.String(36), db.ForeignKey('tasks.id'))
     url = db.Column(db.String(2048), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now() + timedelta(hours=3))
+    created_at = db.Column(db.DateTime, default=_local_now)
     content_length = db.Column(db.Integer, nullable=True)
     user_id = db.Column(db.String(64),nullable=True)
+    crawl_output = db.Column(db.Text, nullable=True)  # Bulunan URL'ler (satır satır)
+    search_vector = db.Column(TSVECTOR, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_crawl_results_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
 
     # Görevle ilişki
@@ -69,9 +167,14 @@ class NmapResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.String(36), db.ForeignKey('tasks.id'))
     target = db.Column(db.String(2048), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now() + timedelta(hours=3))
+    created_at = db.Column(db.DateTime, default=_local_now)
     scan_result = db.Column(db.Text, nullable=True)
     user_id = db.Column(db.String(64),nullable=True)
+    search_vector = db.Column(TSVECTOR, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_nmap_results_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
 
     # Görevle ilişki
@@ -86,12 +189,108 @@ class WhoisResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.String(36), db.ForeignKey('tasks.id'))
     domain = db.Column(db.String(255), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now() + timedelta(hours=3))
+    created_at = db.Column(db.DateTime, default=_local_now)
     whois_data = db.Column(db.Text, nullable=True)
     user_id = db.Column(db.String(64),nullable=True)
+    search_vector = db.Column(TSVECTOR, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_whois_results_search_vector', 'search_vector', postgresql_using='gin'),
+    )
 
     # Görevle ilişki
     task = db.relationship('Task', backref=db.backref('whois_results', lazy=True))
     
     def __repr__(self):
-        return f"<WhoisResult {self.id}: {self.domain}>"
\ No newline at end of file
+        return f"<WhoisResult {self.id}: {self.domain}>"
+
+class ScanSchedule(db.Model):
+    __tablename__ = 'scan_schedules'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(64), nullable=False, index=True)
+    task_type = db.Column(db.String(50), nullable=False)  # run_nmap, whois_lookup, run_katana
+    target = db.Column(db.String(2048), nullable=False)
+    interval_minutes = db.Column(db.Integer, nullable=False, default=1440)
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    next_run_at = db.Column(db.DateTime, nullable=False, index=True)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=_local_now)
+
+    def __repr__(self):
+        return f"<ScanSchedule {self.id} ({self.task_type}): {self.target}>"
+
+    def to_dict(self):
+        """
+        ScanSchedule modelini JSON serileştirilebilir bir sözlüğe dönüştürür
+        """
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'task_type': self.task_type,
+            'target': self.target,
+            'interval_minutes': self.interval_minutes,
+            'enabled': self.enabled,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class ScheduleRun(db.Model):
+    __tablename__ = 'schedule_runs'
+
+    # Birleştirilmiş (coalesced) bir çalıştırma birden fazla zamanlamaya ait olabilir,
+    # bu yüzden zamanlama ile görev arasındaki ilişki ayrı bir tabloda tutulur
+    id = db.Column(db.Integer, primary_key=True)
+    schedule_id = db.Column(db.Integer, db.ForeignKey('scan_schedules.id', ondelete='CASCADE'), nullable=False, index=True)
+    task_id = db.Column(db.String(36), db.ForeignKey('tasks.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=_local_now)
+
+    # Zamanlama ve görevle ilişki
+    schedule = db.relationship('ScanSchedule', backref=db.backref('runs', lazy=True, cascade='all, delete-orphan'))
+    task = db.relationship('Task', backref=db.backref('schedule_runs', lazy=True))
+
+    def __repr__(self):
+        return f"<ScheduleRun {self.schedule_id} -> {self.task_id}>"
+
+class ToolLease(db.Model):
+    __tablename__ = 'tool_leases'
+
+    # Havuzdaki araç container'larında çalışan görevler; en az yüklü
+    # container seçimi tüm worker düğümlerinde bu tablodan yapılır
+    id = db.Column(db.Integer, primary_key=True)
+    tool = db.Column(db.String(50), nullable=False)
+    instance = db.Column(db.String(255), nullable=False)
+    task_id = db.Column(db.String(36), nullable=True)
+    started_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.Index('ix_tool_leases_tool_instance', 'tool', 'instance'),
+    )
+
+    def __repr__(self):
+        return f"<ToolLease {self.tool}@{self.instance}: {self.task_id}>"
+
+class TaskStat(db.Model):
+    __tablename__ = 'task_stats'
+
+    # Görev tipi başına zaman kovası (resolution: minute, hour, day). Satırlar
+    # rollups.py tarafından artımlı olarak güncellenir ve birleştirilir.
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.String(10), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    task_type = db.Column(db.String(50), nullable=False)
+    submitted = db.Column(db.Integer, nullable=False, default=0)
+    succeeded = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    duration_sum = db.Column(db.Float, nullable=False, default=0.0)
+    duration_count = db.Column(db.Integer, nullable=False, default=0)
+    # Süre dağılımı: log ölçekli kova indeksi -> görev sayısı
+    histogram = db.Column(JSONB, nullable=False, default=dict)
+
+    __table_args__ = (
+        db.UniqueConstraint('resolution', 'bucket_start', 'task_type', name='uq_task_stats_bucket'),
+    )
+
+    def __repr__(self):
+        return f"<TaskStat {self.resolution} {self.bucket_start} {self.task_type}>"
@@ -0,0 +1,242 @@
+"""
+Görev istatistikleri için artımlı zaman serisi özetleri (rollup)
+
+Her görev tipi için dakikalık kovalarda gönderilen, başarılı ve başarısız görev
+sayısı, toplam süre ve süre dağılımı (log ölçekli histogram) tutulur.
+Gönderimler Task kaydı eklenirken, tamamlanmalar worker'da görev bittiğinde
+yazılır. Eski dakikalık kovalar periyodik olarak saatlik, eski saatlik kovalar
+günlük kovalara birleştirilir; böylece istenen aralık ne kadar uzun olursa
+olsun okunan satır sayısı tasks tablosunun boyutundan bağımsız kalır.
+"""
+import json
+import math
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, text
+
+from model import db, Task, TaskStat
+
+# Histogram kovalarının göreli hata payı: kova i, (γ^(i-1), γ^i] saniye aralığını sayar
+SKETCH_RELATIVE_ACCURACY = 0.05
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+SKETCH_MIN_SECONDS = 0.001
+
+RESOLUTIONS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+# Bu süreden eski dakikalık kovalar saatliğe, saatlik kovalar günlüğe birleştirilir
+STATS_MINUTE_RETENTION = timedelta(hours=int(os.environ.get('STATS_MINUTE_RETENTION_HOURS', 24)))
+STATS_HOUR_RETENTION = timedelta(days=int(os.environ.get('STATS_HOUR_RETENTION_DAYS', 30)))
+# Otomatik çözünürlük seçiminde bir seride olabilecek en fazla nokta sayısı
+STATS_MAX_POINTS = int(os.environ.get('STATS_MAX_POINTS', 500))
+
+COMPLETED_STATUSES = ('SUCCESS', 'FAILURE')
+
+
+def sketch_index(seconds):
+    return math.ceil(math.log(max(seconds, SKETCH_MIN_SECONDS)) / math.log(SKETCH_GAMMA))
+
+
+def sketch_merge(histogram, other):
+    """
+    İki histogramı toplar (kova indeksleri JSON uyumu için metin olarak tutulur)
+    """
+    for index, count in (other or {}).items():
+        histogram[index] = histogram.get(index, 0) + count
+    return histogram
+
+
+def sketch_quantile(histogram, q):
+    """
+    Histogramdan q yüzdeliğini (0-1) yaklaşık olarak hesaplar; boşsa None
+    """
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for index in sorted(histogram, key=int):
+        seen += histogram[index]
+        if seen > rank:
+            return round(2 * SKETCH_GAMMA ** int(index) / (SKETCH_GAMMA + 1), 3)
+
+
+def bucket_start(moment, resolution):
+    if resolution == 'minute':
+        return moment.replace(second=0, microsecond=0)
+    if resolution == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _now():
+    return datetime.now() + timedelta(hours=3)
+
+
+# Aynı kovaya eşzamanlı yazan süreçler satırı tek ifadede artırır
+_UPSERT = text("""
+    INSERT INTO task_stats (resolution, bucket_start, task_type, submitted, succeeded, failed,
+                            duration_sum, duration_count, histogram)
+    VALUES (:resolution, :bucket_start, :task_type, :submitted, :succeeded, :failed,
+            :duration_sum, :duration_count, CAST(:histogram AS JSONB))
+    ON CONFLICT ON CONSTRAINT uq_task_stats_bucket DO UPDATE SET
+        submitted = task_stats.submitted + EXCLUDED.submitted,
+        succeeded = task_stats.succeeded + EXCLUDED.succeeded,
+        failed = task_stats.failed + EXCLUDED.failed,
+        duration_sum = task_stats.duration_sum + EXCLUDED.duration_sum,
+        duration_count = task_stats.duration_count + EXCLUDED.duration_count,
+        histogram = task_stats.histogram || (
+            SELECT coalesce(jsonb_object_agg(e.key, coalesce((task_stats.histogram ->> e.key)::bigint, 0) + e.value::bigint), '{}'::jsonb)
+            FROM jsonb_each_text(EXCLUDED.histogram) AS e
+        )
+""")
+
+
+def _upsert(connection, resolution, bucket, task_type, submitted=0, succeeded=0, failed=0,
+            duration_sum=0.0, duration_count=0, histogram=None):
+    connection.execute(_UPSERT, {
+        'resolution': resolution,
+        'bucket_start': bucket,
+        'task_type': task_type,
+        'submitted': submitted,
+        'succeeded': succeeded,
+        'failed': failed,
+        'duration_sum': duration_sum,
+        'duration_count': duration_count,
+        'histogram': json.dumps(histogram or {}),
+    })
+
+
+def record_submitted(connection, task_type, moment=None):
+    _upsert(connection, 'minute', bucket_start(moment or _now(), 'minute'), task_type, submitted=1)
+
+
+def record_completed(connection, task_type, status, duration=None, moment=None):
+    """
+    Tamamlanan bir görevi dakikalık kovaya ekler; süre bilinmiyorsa yalnızca sayılır
+    """
+    values = {'succeeded': int(status == 'SUCCESS'), 'failed': int(status == 'FAILURE')}
+    if duration is not None:
+        values.update({
+            'duration_sum': duration,
+            'duration_count': 1,
+            'histogram': {str(sketch_index(duration)): 1},
+        })
+    _upsert(connection, 'minute', bucket_start(moment or _now(), 'minute'), task_type, **values)
+
+
+def _on_task_insert(mapper, connection, target):
+    record_submitted(connection, target.task_type)
+
+
+def track_submissions():
+    """
+    Task kaydı eklenen her yerde (API, zamanlayıcı, pipeline) gönderimi sayar
+    """
+    if not event.contains(Task, 'after_insert', _on_task_insert):
+        event.listen(Task, 'after_insert', _on_task_insert)
+
+
+def _new_point():
+    return {'submitted': 0, 'succeeded': 0, 'failed': 0, 'duration_sum': 0.0, 'duration_count': 0, 'histogram': {}}
+
+
+def _add_row(point, row):
+    point['submitted'] += row.submitted
+    point['succeeded'] += row.succeeded
+    point['failed'] += row.failed
+    point['duration_sum'] += row.duration_sum
+    point['duration_count'] += row.duration_count
+    sketch_merge(point['histogram'], row.histogram)
+    return point
+
+
+def compact(now=None):
+    """
+    Saklama süresini aşan dakikalık kovaları saatlik, saatlik kovaları günlük
+    kovalara birleştirir. Flask uygulama bağlamı içinde çağrılmalıdır.
+    """
+    now = now or _now()
+    compacted = {}
+    for source, target, retention in (('minute', 'hour', STATS_MINUTE_RETENTION),
+                                      ('hour', 'day', STATS_HOUR_RETENTION)):
+        cutoff = bucket_start(now - retention, target)
+        rows = (TaskStat.query
+                .filter(TaskStat.resolution == source, TaskStat.bucket_start < cutoff)
+                .with_for_update(skip_locked=True)
+                .all())
+        merged = {}
+        for row in rows:
+            key = (bucket_start(row.bucket_start, target), row.task_type)
+            _add_row(merged.setdefault(key, _new_point()), row)
+
+        connection = db.session.connection()
+        for (bucket, task_type), point in merged.items():
+            _upsert(connection, target, bucket, task_type, **point)
+        if rows:
+            TaskStat.query.filter(TaskStat.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        db.session.commit()
+        compacted[source] = len(rows)
+    return compacted
+
+
+def choose_resolution(start, end, requested=None, now=None):
+    """
+    Aralığı STATS_MAX_POINTS noktaya sığdıran en ince çözünürlüğü seçer. Başlangıcı
+    birleştirilmiş döneme düşen aralıklar için daha ince çözünürlük verisi olmadığından
+    çözünürlük en az o dönemin çözünürlüğüne yükseltilir.
+    """
+    now = now or _now()
+    names = list(RESOLUTIONS)
+    if requested:
+        chosen = names.index(requested)
+    else:
+        chosen = next((i for i, name in enumerate(names)
+                       if (end - start) / RESOLUTIONS[name] <= STATS_MAX_POINTS), len(names) - 1)
+    if start < now - STATS_HOUR_RETENTION:
+        chosen = max(chosen, names.index('day'))
+    elif start < now - STATS_MINUTE_RETENTION:
+        chosen = max(chosen, names.index('hour'))
+    return names[chosen]
+
+
+def _summary(point):
+    return {
+        'submitted': point['submitted'],
+        'succeeded': point['succeeded'],
+        'failed': point['failed'],
+        'avg_duration': round(point['duration_sum'] / point['duration_count'], 3) if point['duration_count'] else None,
+        'p50_duration': sketch_quantile(point['histogram'], 0.5),
+        'p95_duration': sketch_quantile(point['histogram'], 0.95),
+    }
+
+
+def series(start, end, resolution, task_type=None):
+    """
+    [start, end) aralığını verilen çözünürlükte nokta dizisi ve toplam olarak döndürür.
+    Henüz birleştirilmemiş daha ince kovalar da okunup aynı noktalara eklenir.
+    """
+    names = list(RESOLUTIONS)
+    finer = names[:names.index(resolution) + 1]
+    query = TaskStat.query.filter(
+        TaskStat.resolution.in_(finer),
+        TaskStat.bucket_start >= bucket_start(start, resolution),
+        TaskStat.bucket_start < end
+    )
+    if task_type:
+        query = query.filter(TaskStat.task_type == task_type)
+
+    points = {}
+    total = _new_point()
+    for row in query:
+        _add_row(points.setdefault(bucket_start(row.bucket_start, resolution), _new_point()), row)
+        _add_row(total, row)
+
+    return {
+        'points': [{'bucket_start': bucket.isoformat(), **_summary(point)}
+                   for bucket, point in sorted(points.items())],
+        'total': _summary(total),
+    }
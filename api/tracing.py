@@ -0,0 +1,219 @@
+"""
+API ve worker arasında uçtan uca istek izleme (tracing)
+
+Span'ler W3C `traceparent` başlığı ile Celery mesajlarında taşınır ve
+Zipkin v2 JSON formatında bir dosyaya (NDJSON) ve/veya bir collector'a
+gönderilir. Örnekleme oranı TRACE_SAMPLE_RATE ile ayarlanır; örneklenmeyen
+isteklerde span'ler hiçbir şey kaydetmez.
+"""
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.0))
+TRACE_EXPORT_FILE = os.environ.get('TRACE_EXPORT_FILE', '')
+TRACE_COLLECTOR_URL = os.environ.get('TRACE_COLLECTOR_URL', '')  # örn. http://collector:9411/api/v2/spans
+TRACE_SERVICE_NAME = os.environ.get('TRACE_SERVICE_NAME', 'cyberlens')
+TRACE_BATCH_SIZE = 100
+TRACE_FLUSH_INTERVAL = 2.0
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, sampled=False, tags=None, start=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.tags = dict(tags or {})
+        self.start = start if start is not None else time.time()
+        self.end = None
+
+    def set_tag(self, key, value):
+        if self.sampled:
+            self.tags[key] = value
+
+    def finish(self, end=None):
+        if self.end is not None:
+            return
+        self.end = end if end is not None else time.time()
+        if self.sampled:
+            _exporter.submit(self.to_dict())
+
+    def to_dict(self):
+        """
+        Span'i Zipkin v2 JSON formatına dönüştürür
+        """
+        data = {
+            'traceId': self.trace_id,
+            'id': self.span_id,
+            'name': self.name,
+            'timestamp': int(self.start * 1_000_000),
+            'duration': max(int((self.end - self.start) * 1_000_000), 1),
+            'localEndpoint': {'serviceName': TRACE_SERVICE_NAME},
+            'tags': {key: str(value) for key, value in self.tags.items()},
+        }
+        if self.parent_id:
+            data['parentId'] = self.parent_id
+        return data
+
+
+def current_span():
+    return _current_span.get()
+
+
+def _new_span(name, parent=None, tags=None, start=None):
+    parent = parent if parent is not None else _current_span.get()
+    if parent is None:
+        trace_id = '%032x' % random.getrandbits(128)
+        sampled = TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE
+        return Span(name, trace_id, sampled=sampled, tags=tags, start=start)
+    return Span(name, parent.trace_id, parent_id=parent.span_id, sampled=parent.sampled, tags=tags, start=start)
+
+
+def start_span(name, parent=None, **tags):
+    """
+    Yeni bir span başlatır ve onu geçerli span yapar; bitirmek için end_span kullanılır
+    """
+    span = _new_span(name, parent=parent, tags=tags)
+    token = _current_span.set(span)
+    return span, token
+
+
+def end_span(span, token, error=None):
+    if error is not None:
+        span.set_tag('error', error)
+    span.finish()
+    _current_span.reset(token)
+
+
+@contextmanager
+def span(name, **tags):
+    current, token = start_span(name, **tags)
+    try:
+        yield current
+    except Exception as e:
+        current.set_tag('error', str(e))
+        raise
+    finally:
+        end_span(current, token)
+
+
+def record_span(name, start, end, parent=None, **tags):
+    """
+    Başlangıç ve bitişi önceden bilinen bir span kaydeder (örn. kuyruk bekleme süresi)
+    """
+    recorded = _new_span(name, parent=parent, tags=tags, start=start)
+    recorded.finish(end=end)
+    return recorded
+
+
+def inject_headers(parent=None):
+    """
+    Geçerli izleme bağlamını Celery mesaj başlıklarına yazar
+    """
+    parent = parent if parent is not None else _current_span.get()
+    headers = {'enqueued_at': time.time()}
+    if parent is not None:
+        flags = '01' if parent.sampled else '00'
+        headers['traceparent'] = f"00-{parent.trace_id}-{parent.span_id}-{flags}"
+    return headers
+
+
+def extract_parent(traceparent):
+    """
+    `traceparent` başlığından uzak üst span'i oluşturur
+    """
+    if not traceparent:
+        return None
+    try:
+        _, trace_id, span_id, flags = traceparent.split('-')
+    except ValueError:
+        return None
+    remote = Span('remote', trace_id, sampled=flags == '01')
+    remote.span_id = span_id
+    return remote
+
+
+def instrument_sqlalchemy(engine):
+    """
+    Her SQL ifadesi için bir span oluşturur
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        if parent is not None and parent.sampled:
+            verb = statement.lstrip().split(' ', 1)[0].upper()
+            context._trace_span = _new_span(f"db.{verb.lower()}", parent=parent, tags={'db.statement': statement[:200]})
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        db_span = getattr(context, '_trace_span', None)
+        if db_span is not None:
+            db_span.finish()
+
+
+class _Exporter:
+    """
+    Biten span'leri arka plandaki bir thread ile toplu olarak dışa aktarır
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=10000)
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, span_dict):
+        if not TRACE_EXPORT_FILE and not TRACE_COLLECTOR_URL:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span_dict)
+        except queue.Full:
+            pass  # Yük altında span kaybı kabul edilebilir
+
+    def _ensure_thread(self):
+        # Prefork worker'larda fork sonrası thread'i yeniden başlat
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=10000)
+            threading.Thread(target=self._run, daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + TRACE_FLUSH_INTERVAL
+            while len(batch) < TRACE_BATCH_SIZE and time.time() < deadline:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.time(), 0.01)))
+                except queue.Empty:
+                    break
+            self._export(batch)
+
+    def _export(self, batch):
+        try:
+            if TRACE_EXPORT_FILE:
+                with open(TRACE_EXPORT_FILE, 'a') as f:
+                    for item in batch:
+                        f.write(json.dumps(item) + '\n')
+            if TRACE_COLLECTOR_URL:
+                import requests
+                requests.post(TRACE_COLLECTOR_URL, json=batch, timeout=5)
+        except Exception as e:
+            print(f"Trace export error: {e}")
+
+
+_exporter = _Exporter()
@@ -0,0 +1,250 @@
+"""
+Kuyruk derinliğine ve araç başına maliyet modeline göre çalışan Celery autoscaler
+
+Celery'nin varsayılan autoscaler'ı yalnızca worker'ın önceden aldığı (prefetch)
+görev sayısına bakar. Bu sınıf her aracın kuyruğundaki bekleyen mesaj sayısını
+RabbitMQ'dan okur, her aracın gözlenen ortalama çalışma süresi ve bellek
+kullanımıyla ağırlıklandırır ve havuz boyutunu container'ın CPU ve bellek
+sınırları içinde tutar.
+
+Kullanım: celery -A celery_app worker --autoscale=MAX,MIN
+(worker_autoscaler ayarı celery_app.py içinde bu sınıfı gösterir)
+"""
+import os
+import threading
+from time import monotonic, sleep, time
+
+from celery.utils.log import get_logger
+from celery.worker import state
+from celery.worker.autoscale import Autoscaler
+
+logger = get_logger(__name__)
+
+# Görev adı -> kuyruk adı (celery_app.TOOL_QUEUES ile aynı olmalı)
+TOOL_QUEUES = {
+    'celery_app.run_nmap': 'nmap',
+    'celery_app.whois_lookup': 'whois',
+    'celery_app.run_katana': 'katana',
+    'celery_app.run_command': 'celery',
+    'celery_app.dispatch_schedules': 'celery',
+    'celery_app.compact_task_stats': 'celery',
+    'celery_app.cleanup_artifacts': 'celery',
+    'celery_app.pipeline_fan_out': 'pipeline',
+    'celery_app.pipeline_lane': 'pipeline',
+}
+
+# Gözlem yokken kullanılan başlangıç değerleri: (ortalama süre sn, süreç başına bellek MB)
+DEFAULT_TOOL_COSTS = {
+    'nmap': (120.0, 90.0),
+    'whois': (5.0, 70.0),
+    'katana': (180.0, 160.0),
+    'celery': (10.0, 80.0),
+    'pipeline': (600.0, 120.0),
+}
+
+AUTOSCALE_POLL_INTERVAL = float(os.environ.get('AUTOSCALE_POLL_INTERVAL', 5))
+# Çalışan görevlerin izlenme sıklığı; biten görevler en geç bu kadar gecikmeyle ölçülür
+AUTOSCALE_OBSERVE_INTERVAL = float(os.environ.get('AUTOSCALE_OBSERVE_INTERVAL', 1))
+# Bekleyen işin bu sürede bitirilmesi hedeflenir
+AUTOSCALE_TARGET_DRAIN_SECONDS = float(os.environ.get('AUTOSCALE_TARGET_DRAIN_SECONDS', 120))
+# Araçlar başka container'larda çalıştığı için süreçler çoğunlukla I/O bekler
+AUTOSCALE_PROCS_PER_CPU = float(os.environ.get('AUTOSCALE_PROCS_PER_CPU', 4))
+# Ana worker süreci ve beklenmedik büyük çıktılar için ayrılan bellek (MB)
+AUTOSCALE_MEMORY_RESERVE_MB = float(os.environ.get('AUTOSCALE_MEMORY_RESERVE_MB', 200))
+# Gözlemlerin hareketli ortalamasındaki ağırlık
+AUTOSCALE_EWMA_ALPHA = 0.2
+
+
+def _read_first_line(path):
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def container_memory_limit_mb():
+    """
+    cgroup (v2 veya v1) bellek sınırını MB olarak döndürür; sınır yoksa sistem belleği
+    """
+    value = _read_first_line('/sys/fs/cgroup/memory.max') or _read_first_line('/sys/fs/cgroup/memory/memory.limit_in_bytes')
+    if value and value != 'max' and int(value) < (1 << 60):
+        return int(value) / (1024 * 1024)
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / (1024 * 1024)
+
+
+def container_cpu_limit():
+    """
+    cgroup (v2 veya v1) CPU kotasını çekirdek sayısı olarak döndürür
+    """
+    value = _read_first_line('/sys/fs/cgroup/cpu.max')
+    if value:
+        quota, period = value.split()
+        if quota != 'max':
+            return int(quota) / int(period)
+    quota = _read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+    period = _read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return float(os.cpu_count() or 1)
+
+
+def process_rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class QueueDepthAutoscaler(Autoscaler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.costs = {queue: list(cost) for queue, cost in DEFAULT_TOOL_COSTS.items()}
+        self.memory_limit_mb = container_memory_limit_mb()
+        self.cpu_limit = container_cpu_limit()
+        self.queue_depths = {}
+        self._running = {}  # request id -> (kuyruk, başlangıç, en yüksek RSS)
+        self._observe_lock = threading.Lock()
+        self._poller = None
+        self._observer = None
+
+    def _maybe_scale(self, req=None):
+        # Prefork worker bu metodu olay döngüsünden her mesajda çağırır; RabbitMQ'ya
+        # yapılan sorgular arka plan thread'inde yapılır, burada yalnızca son değer okunur
+        if self._poller is None:
+            self._poller = threading.Thread(target=self._poll_queue_depths, name='autoscale-queue-poller', daemon=True)
+            self._poller.start()
+        # maybe_scale boşta yalnızca keepalive aralığında çağrılır; kısa görevlerin
+        # bitişi kaçırılmasın diye görevler ayrıca kısa aralıklarla izlenir
+        if self._observer is None:
+            self._observer = threading.Thread(target=self._observe_loop, name='autoscale-task-observer', daemon=True)
+            self._observer.start()
+
+        self._observe_running(monotonic())
+
+        procs = self.processes
+        target = self.desired_concurrency()
+        if target > procs:
+            self.scale_up(target - procs)
+            return True
+        if target < procs:
+            self.scale_down(procs - target)
+            return True
+
+    def _observe_loop(self):
+        while True:
+            sleep(AUTOSCALE_OBSERVE_INTERVAL)
+            try:
+                self._observe_running(monotonic())
+            except Exception as e:
+                logger.warning('Autoscaler: task observation failed: %r', e)
+
+    @staticmethod
+    def _request_started(request, now):
+        """
+        Görevin havuz süreci tarafından kabul edildiği anı monotonic saate çevirir;
+        henüz kabul edilmemişse None. billiard sürümüne göre time_start duvar saati
+        veya monotonic saat olabilir, hangisine yakınsa o kabul edilir.
+        """
+        time_start = getattr(request, 'time_start', None)
+        if not time_start:
+            return None
+        wall = time()
+        if abs(wall - time_start) < abs(now - time_start):
+            return now - (wall - time_start)
+        return time_start
+
+    def _observe_running(self, now):
+        """
+        Aktif görevlerin bellek kullanımını izler; biten görevlerin başlangıçtan
+        itibaren geçen süresini ve en yüksek RSS'ini aracın maliyet ortalamasına ekler
+        """
+        with self._observe_lock:
+            try:
+                requests = list(state.active_requests)
+            except RuntimeError:
+                return  # Olay döngüsü kümeyi o sırada değiştirdi; bir sonraki turda okunur
+
+            active = {}
+            for request in requests:
+                queue = TOOL_QUEUES.get(request.name, 'celery')
+                _, started, peak_rss = self._running.get(request.id, (queue, None, 0.0))
+                started = self._request_started(request, now) or started or now
+                rss = process_rss_mb(request.worker_pid) if request.worker_pid else None
+                active[request.id] = (queue, started, max(peak_rss, rss or 0.0))
+
+            for request_id, (queue, started, peak_rss) in self._running.items():
+                if request_id not in active:
+                    cost = self.costs.setdefault(queue, list(DEFAULT_TOOL_COSTS['celery']))
+                    cost[0] += AUTOSCALE_EWMA_ALPHA * ((now - started) - cost[0])
+                    if peak_rss:
+                        cost[1] += AUTOSCALE_EWMA_ALPHA * (peak_rss - cost[1])
+            self._running = active
+
+    def _poll_queue_depths(self):
+        """
+        Arka plan thread'i: tek bir kalıcı bağlantı ve kanal üzerinden kuyruk
+        derinliklerini AUTOSCALE_POLL_INTERVAL aralıklarla okur. Bağlantı koparsa
+        bir sonraki turda yeniden açılır.
+        """
+        connection = channel = None
+        while True:
+            try:
+                if connection is None:
+                    connection = self.worker.app.connection_for_read()
+                    channel = connection.channel()
+                depths = {}
+                for queue in set(TOOL_QUEUES.values()):
+                    try:
+                        depths[queue] = channel.queue_declare(queue=queue, passive=True).message_count
+                    except connection.channel_errors:
+                        # Kuyruk henüz oluşturulmamış; broker kanalı kapattığı için yenisi açılır
+                        depths[queue] = 0
+                        channel = connection.channel()
+                self.queue_depths = depths
+            except Exception as e:
+                logger.warning('Autoscaler: queue depth poll failed: %r', e)
+                if connection is not None:
+                    try:
+                        connection.release()
+                    except Exception:
+                        pass
+                connection = channel = None
+            sleep(AUTOSCALE_POLL_INTERVAL)
+
+    def desired_concurrency(self):
+        """
+        Bekleyen ve önceden alınmış görevlerden hedef süreç sayısını hesaplar
+        """
+        pending = dict(self.queue_depths)
+        for request in list(state.reserved_requests):
+            queue = TOOL_QUEUES.get(request.name, 'celery')
+            pending[queue] = pending.get(queue, 0) + 1
+
+        total = sum(pending.values())
+        if not total:
+            return self.min_concurrency
+
+        default_cost = DEFAULT_TOOL_COSTS['celery']
+        work_seconds = sum(count * self.costs.get(queue, default_cost)[0] for queue, count in pending.items())
+        memory_per_proc = sum(count * self.costs.get(queue, default_cost)[1] for queue, count in pending.items()) / total
+
+        wanted = min(total, int(work_seconds / AUTOSCALE_TARGET_DRAIN_SECONDS) + 1)
+        memory_cap = int((self.memory_limit_mb - AUTOSCALE_MEMORY_RESERVE_MB) / memory_per_proc)
+        cpu_cap = int(self.cpu_limit * AUTOSCALE_PROCS_PER_CPU)
+        upper = max(min(self.max_concurrency, memory_cap, cpu_cap), self.min_concurrency)
+        return max(min(wanted, upper), self.min_concurrency)
+
+    def info(self):
+        data = super().info()
+        data.update({
+            'queue_depths': self.queue_depths,
+            'costs': {queue: {'avg_runtime': cost[0], 'avg_memory_mb': cost[1]} for queue, cost in self.costs.items()},
+            'memory_limit_mb': self.memory_limit_mb,
+            'cpu_limit': self.cpu_limit,
+        })
+        return data
@@ -0,0 +1,128 @@
+"""
+Araç çıktısının sınırlı bellekle yakalanması
+
+Çıktı CAPTURE_MEMORY_LIMIT bayta kadar bellekte tutulur, aşan kısım geçici
+dosyaya taşınır (SpooledTemporaryFile). Görev sonucuna yalnızca kısa bir önizleme
+yazılır; önizlemeden büyük çıktılar ARTIFACT_DIR altına en fazla ARTIFACT_MAX_BYTES
+bayt olarak kaydedilir ve API üzerinden /api/artifacts/<task_id>/<stream> ile
+indirilebilir. ARTIFACT_RETENTION_DAYS günden eski artifact'ler periyodik olarak
+silinir (bkz. celery_app.cleanup_artifacts).
+"""
+import io
+import os
+import shutil
+import tempfile
+import time
+
+CAPTURE_MEMORY_LIMIT = int(os.environ.get('CAPTURE_MEMORY_LIMIT', 1024 * 1024))
+CAPTURE_PREVIEW_BYTES = int(os.environ.get('CAPTURE_PREVIEW_BYTES', 64 * 1024))
+CAPTURE_SPILL_DIR = os.environ.get('CAPTURE_SPILL_DIR') or None
+ARTIFACT_DIR = os.environ.get('ARTIFACT_DIR', '/data/artifacts')
+ARTIFACT_MAX_BYTES = int(os.environ.get('ARTIFACT_MAX_BYTES', 64 * 1024 * 1024))
+ARTIFACT_RETENTION_DAYS = float(os.environ.get('ARTIFACT_RETENTION_DAYS', 14))
+
+
+class OutputCapture:
+    def __init__(self, memory_limit=CAPTURE_MEMORY_LIMIT):
+        self.file = tempfile.SpooledTemporaryFile(max_size=memory_limit, dir=CAPTURE_SPILL_DIR)
+        self.size = 0
+        self.artifact = None
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    @property
+    def truncated(self):
+        return self.size > CAPTURE_PREVIEW_BYTES
+
+    def read_bytes(self, limit=None):
+        self.file.seek(0)
+        return self.file.read(limit if limit is not None else -1)
+
+    def preview(self, limit=CAPTURE_PREVIEW_BYTES):
+        """
+        Çıktının ilk `limit` baytını metin olarak döndürür
+        """
+        return self.read_bytes(limit).decode('utf-8', errors='replace')
+
+    def pop_trailer(self, marker, max_bytes=4096):
+        """
+        Çıktının sonundaki `marker` ile başlayan bölümü çıktıdan çıkarır ve
+        marker'dan sonrasını metin olarak döndürür; bulunamazsa None
+        """
+        start = max(self.size - max_bytes, 0)
+        self.file.seek(start)
+        tail = self.file.read()
+        index = tail.rfind(marker)
+        if index < 0:
+            return None
+        self.file.truncate(start + index)
+        self.file.seek(0, io.SEEK_END)
+        self.size = start + index
+        return tail[index + len(marker):].decode('utf-8', errors='replace')
+
+    def lines(self):
+        """
+        Çıktıyı tamamını belleğe almadan satır satır okur
+        """
+        self.file.seek(0)
+        reader = io.TextIOWrapper(self.file, encoding='utf-8', errors='replace', newline=None)
+        try:
+            for line in reader:
+                yield line.rstrip('\n')
+        finally:
+            # TextIOWrapper kapanırken alttaki dosyayı kapatmasın
+            reader.detach()
+
+    def save_artifact(self, task_id, stream):
+        """
+        Önizlemeye sığmayan çıktıyı en fazla ARTIFACT_MAX_BYTES bayt olarak
+        ARTIFACT_DIR altına kopyalar
+        """
+        directory = os.path.join(ARTIFACT_DIR, task_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, stream)
+        self.file.seek(0)
+        saved = min(self.size, ARTIFACT_MAX_BYTES)
+        with open(path, 'wb') as f:
+            remaining = saved
+            while remaining:
+                chunk = self.file.read(min(remaining, 65536))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+        self.artifact = {
+            'stream': stream,
+            'bytes': self.size,
+            'saved_bytes': saved,
+            'truncated': saved < self.size,
+            'path': path,
+            'url': f'/api/artifacts/{task_id}/{stream}'
+        }
+        return self.artifact
+
+    def close(self):
+        self.file.close()
+
+
+def remove_expired_artifacts(retention_days=ARTIFACT_RETENTION_DAYS):
+    """
+    Son değişikliği saklama süresinden eski görev artifact dizinlerini siler ve
+    silinen dizin sayısını döndürür
+    """
+    cutoff = time.time() - retention_days * 24 * 3600
+    removed = 0
+    try:
+        entries = list(os.scandir(ARTIFACT_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                shutil.rmtree(entry.path)
+                removed += 1
+        except OSError as e:
+            print(f"Artifact cleanup error ({entry.path}): {e}")
+    return removed
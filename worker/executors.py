@@ -0,0 +1,138 @@
+"""
+Araçların (nmap, whois, katana) nerede çalıştırılacağını belirleyen executor'lar
+
+Her araç için <ARAÇ>_EXECUTOR ortam değişkeni okunur:
+    local                       -> PATH üzerindeki binary doğrudan çalıştırılır
+    container:<ad>              -> docker exec <ad> ...
+    pool:<ad1>,<ad2>,...        -> container havuzu
+    pool:<önek>-{n}             -> <ARAÇ>_REPLICAS kadar container (önek-1 ... önek-N)
+Havuz seçim stratejisi <ARAÇ>_POOL_STRATEGY ile belirlenir: round_robin (varsayılan)
+veya least_loaded. least_loaded tüm worker düğümlerindeki aktif görevleri
+tool_leases tablosundan sayar.
+"""
+import itertools
+import os
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from model import db, ToolLease
+
+# Mevcut docker-compose kurulumundaki container'lar
+DEFAULT_EXECUTORS = {
+    'nmap': 'container:nmap_scanner',
+    'whois': 'container:whois_lookup',
+    'katana': 'container:katana_crawler',
+}
+# Bu süreden eski kiralamalar çökmüş worker'lardan kalmıştır ve sayılmaz
+LEASE_STALE_AFTER = timedelta(seconds=int(os.environ.get('TOOL_LEASE_STALE_SECONDS', 900)))
+
+_flask_app = None
+_executors = {}
+
+
+def init_app(app):
+    """
+    least_loaded stratejisinin veritabanına erişmesi için Flask uygulamasını kaydeder
+    """
+    global _flask_app
+    _flask_app = app
+
+
+class LocalExecutor:
+    name = 'local'
+
+    @contextmanager
+    def command(self, argv, task_id=None):
+        yield list(argv)
+
+
+class ContainerExecutor:
+    def __init__(self, container):
+        self.container = container
+        self.name = f'container:{container}'
+
+    @contextmanager
+    def command(self, argv, task_id=None):
+        yield ['docker', 'exec', self.container] + list(argv)
+
+
+class ContainerPoolExecutor:
+    def __init__(self, tool, containers, strategy='round_robin'):
+        if not containers:
+            raise ValueError(f'{tool} için container havuzu boş')
+        if strategy not in ('round_robin', 'least_loaded'):
+            raise ValueError(f'Geçersiz havuz stratejisi: {strategy}')
+        self.tool = tool
+        self.containers = containers
+        self.strategy = strategy
+        self.name = f'pool:{",".join(containers)}'
+        # Her worker süreci farklı bir noktadan başlasın ki ilk görevler aynı container'a yığılmasın
+        offset = random.randrange(len(containers))
+        self._cycle = itertools.cycle(containers[offset:] + containers[:offset])
+
+    def _least_loaded(self):
+        with _flask_app.app_context():
+            since = datetime.now() + timedelta(hours=3) - LEASE_STALE_AFTER
+            counts = dict(
+                db.session.query(ToolLease.instance, func.count(ToolLease.id))
+                .filter(ToolLease.tool == self.tool, ToolLease.started_at >= since)
+                .group_by(ToolLease.instance)
+                .all()
+            )
+        lowest = min(counts.get(container, 0) for container in self.containers)
+        return random.choice([container for container in self.containers if counts.get(container, 0) == lowest])
+
+    def _acquire(self, container, task_id):
+        with _flask_app.app_context():
+            lease = ToolLease(tool=self.tool, instance=container, task_id=task_id,
+                              started_at=datetime.now() + timedelta(hours=3))
+            db.session.add(lease)
+            db.session.commit()
+            return lease.id
+
+    def _release(self, lease_id):
+        with _flask_app.app_context():
+            db.session.query(ToolLease).filter_by(id=lease_id).delete()
+            db.session.commit()
+
+    @contextmanager
+    def command(self, argv, task_id=None):
+        if self.strategy == 'least_loaded' and _flask_app is not None:
+            container = self._least_loaded()
+            lease_id = self._acquire(container, task_id)
+            try:
+                yield ['docker', 'exec', container] + list(argv)
+            finally:
+                self._release(lease_id)
+        else:
+            yield ['docker', 'exec', next(self._cycle)] + list(argv)
+
+
+def _parse_executor(tool, spec):
+    kind, _, value = spec.partition(':')
+    if kind == 'local':
+        return LocalExecutor()
+    if kind == 'container' and value:
+        return ContainerExecutor(value)
+    if kind == 'pool' and value:
+        if '{n}' in value:
+            replicas = int(os.environ.get(f'{tool.upper()}_REPLICAS', 1))
+            containers = [value.replace('{n}', str(n)) for n in range(1, replicas + 1)]
+        else:
+            containers = [name.strip() for name in value.split(',') if name.strip()]
+        strategy = os.environ.get(f'{tool.upper()}_POOL_STRATEGY', 'round_robin')
+        return ContainerPoolExecutor(tool, containers, strategy)
+    raise ValueError(f'Geçersiz executor tanımı ({tool}): {spec}')
+
+
+def get_executor(tool):
+    """
+    Aracın yapılandırılmış executor'ını döndürür (süreç başına bir kez oluşturulur)
+    """
+    if tool not in _executors:
+        spec = os.environ.get(f'{tool.upper()}_EXECUTOR', DEFAULT_EXECUTORS.get(tool, 'local'))
+        _executors[tool] = _parse_executor(tool, spec)
+    return _executors[tool]
@@ -0,0 +1,176 @@
+"""
+Araç alt süreçleri için kaynak kullanımı ölçümü
+
+Yerel araçlarda alt süreç os.wait4 ile beklenir ve rusage bilgisi (CPU süresi,
+en yüksek RSS) alınır. `docker exec` ile çalışan araçlarda os.wait4 yalnızca
+docker CLI'ını ölçer; bu yüzden araç container içinde bir sh sarmalayıcısıyla
+çalıştırılır ve aracın kendi CPU süresi sh'nin `times` çıktısından okunur.
+Container içinden süreç başına en yüksek RSS taşınabilir biçimde okunamadığı
+için bu araçlarda max_rss_kb boş (NULL) bırakılır. Ayrıca container'ın CPU
+sayacı Docker API'sinden çalıştırma öncesi ve sonrası okunur; bu değer aynı
+container'da eşzamanlı çalışan diğer işleri de içerir.
+"""
+import http.client
+import json
+import os
+import re
+import socket
+import threading
+
+DOCKER_SOCKET = os.environ.get('DOCKER_SOCKET', '/var/run/docker.sock')
+
+# Sarmalayıcının stderr sonuna eklediği ölçüm bölümünün başlangıcı
+USAGE_MARKER = b'\n__cyberlens_usage__\n'
+_USAGE_WRAPPER = '"$@"; rc=$?; printf "\\n__cyberlens_usage__\\n" >&2; times >&2; exit $rc'
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=2):
+        super().__init__('localhost', timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+def container_cpu_seconds(container):
+    """
+    Container'ın toplam CPU kullanımını (saniye) Docker API'sinden okur; okunamazsa None
+    """
+    connection = _UnixHTTPConnection(DOCKER_SOCKET)
+    try:
+        connection.request('GET', f'/containers/{container}/stats?stream=false&one-shot=true')
+        response = connection.getresponse()
+        if response.status != 200:
+            return None
+        stats = json.loads(response.read())
+        return stats['cpu_stats']['cpu_usage']['total_usage'] / 1e9
+    except (OSError, KeyError, ValueError, http.client.HTTPException):
+        return None
+    finally:
+        connection.close()
+
+
+def new_usage():
+    return {
+        'wall_time': 0.0,
+        'cpu_time': 0.0,
+        'max_rss_kb': 0,
+        'stdout_bytes': 0,
+        'stderr_bytes': 0,
+        'container_cpu_time': None,
+    }
+
+
+def add_usage(total, usage):
+    """
+    Bir görev birden fazla alt süreç çalıştırırsa kullanımları toplar; ölçülemeyen
+    (None) bir değer varsa toplam da None olur
+    """
+    total['wall_time'] += usage['wall_time']
+    if total['cpu_time'] is not None:
+        total['cpu_time'] = None if usage['cpu_time'] is None else total['cpu_time'] + usage['cpu_time']
+    if total['max_rss_kb'] is not None:
+        total['max_rss_kb'] = None if usage['max_rss_kb'] is None else max(total['max_rss_kb'], usage['max_rss_kb'])
+    total['stdout_bytes'] += usage['stdout_bytes']
+    total['stderr_bytes'] += usage['stderr_bytes']
+    if usage['container_cpu_time'] is not None:
+        total['container_cpu_time'] = (total['container_cpu_time'] or 0.0) + usage['container_cpu_time']
+    return total
+
+
+def _drain(stream, sink):
+    for chunk in iter(lambda: stream.read(65536), b''):
+        sink.write(chunk)
+    stream.close()
+
+
+def wait_with_usage(process, stdout_sink, stderr_sink, timeout=None):
+    """
+    Süreç çıktısını verilen hedeflere (write metodu olan nesneler) yazar,
+    süreci os.wait4 ile bekler ve (rusage, zaman aşımı oldu mu) döndürür
+    """
+    readers = [
+        threading.Thread(target=_drain, args=(process.stdout, stdout_sink), daemon=True),
+        threading.Thread(target=_drain, args=(process.stderr, stderr_sink), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, _kill) if timeout else None
+    if timer:
+        timer.start()
+    try:
+        _, status, rusage = os.wait4(process.pid, 0)
+    finally:
+        if timer:
+            timer.cancel()
+    # Popen süreci tekrar beklemeye çalışmasın
+    process.returncode = os.waitstatus_to_exitcode(status)
+    for reader in readers:
+        reader.join()
+
+    return rusage, timed_out.is_set()
+
+
+def container_of(cmd):
+    """
+    `docker exec <container> ...` komutlarında container adını döndürür
+    """
+    if cmd[:2] == ['docker', 'exec'] and len(cmd) > 2:
+        return cmd[2]
+    return None
+
+
+def measured_command(cmd):
+    """
+    `docker exec` komutlarında aracı container içinde CPU süresini ölçen bir sh
+    sarmalayıcısıyla çalıştırır; diğer komutları olduğu gibi döndürür
+    """
+    if not container_of(cmd):
+        return cmd
+    return cmd[:3] + ['sh', '-c', _USAGE_WRAPPER, 'sh'] + cmd[3:]
+
+
+def parse_times(text):
+    """
+    `times` çıktısının ikinci satırından (alt süreçler) user+sys CPU süresini
+    saniye olarak döndürür; okunamazsa None
+    """
+    lines = [line for line in (text or '').splitlines() if line.strip()]
+    if len(lines) < 2:
+        return None
+    values = re.findall(r'(?:(\d+)m)?(\d+(?:\.\d+)?)s', lines[1])
+    if len(values) != 2:
+        return None
+    return sum(int(minutes or 0) * 60 + float(seconds) for minutes, seconds in values)
+
+
+def make_usage(wall_time, rusage, stdout_bytes, stderr_bytes, container=None, container_cpu_before=None,
+               tool_cpu_time=None):
+    """
+    container verilmişse rusage docker CLI'ına aittir; CPU süresi olarak sarmalayıcının
+    ölçtüğü tool_cpu_time kullanılır, RSS ölçülemediği için None yazılır
+    """
+    container_cpu_time = None
+    if container and container_cpu_before is not None:
+        container_cpu_after = container_cpu_seconds(container)
+        if container_cpu_after is not None:
+            container_cpu_time = max(container_cpu_after - container_cpu_before, 0.0)
+
+    return {
+        'wall_time': wall_time,
+        'cpu_time': tool_cpu_time if container else rusage.ru_utime + rusage.ru_stime,
+        'max_rss_kb': None if container else rusage.ru_maxrss,
+        'stdout_bytes': stdout_bytes,
+        'stderr_bytes': stderr_bytes,
+        'container_cpu_time': container_cpu_time,
+    }
@@ -0,0 +1,177 @@
+"""
+Tarama hedeflerinin kanonik hale getirilmesi ve önbellekli DNS çözümleme
+
+Aynı host'un farklı yazımları (büyük/küçük harf, şema, port, sondaki nokta,
+unicode domain) tek bir kanonik değere indirgenir. Bu değer araçlara
+gönderilir ve önbellekleme/tekilleştirme için anahtar olarak kullanılır.
+"""
+import ipaddress
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+import idna
+
+DNS_CACHE_SIZE = int(os.environ.get('DNS_CACHE_SIZE', 4096))
+DNS_CACHE_TTL = int(os.environ.get('DNS_CACHE_TTL', 300))
+DNS_NEGATIVE_TTL = int(os.environ.get('DNS_NEGATIVE_TTL', 60))
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class InvalidTarget(ValueError):
+    pass
+
+
+class UnresolvableTarget(InvalidTarget):
+    pass
+
+
+class DNSCache:
+    """
+    Boyutu sınırlı, TTL'li DNS önbelleği (LRU)
+    """
+
+    def __init__(self, maxsize=DNS_CACHE_SIZE, ttl=DNS_CACHE_TTL, negative_ttl=DNS_NEGATIVE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, host):
+        """
+        Host'un IP adreslerini döndürür; çözümlenemiyorsa boş liste döner
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(host)
+                return entry[1]
+
+        try:
+            infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+            addresses = sorted({info[4][0] for info in infos})
+        except (socket.gaierror, UnicodeError):
+            addresses = []
+
+        ttl = self.ttl if addresses else self.negative_ttl
+        with self._lock:
+            self._entries[host] = (now + ttl, addresses)
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return addresses
+
+
+dns_cache = DNSCache()
+
+
+def _parse_ip(value):
+    try:
+        return ipaddress.ip_address(value.strip('[]'))
+    except ValueError:
+        return None
+
+
+def canonicalize_host(value):
+    """
+    Şema, kullanıcı bilgisi, port ve yolu atarak host'u küçük harfli,
+    IDNA kodlu biçime getirir. IP adresleri sıkıştırılmış biçimde döner.
+    """
+    value = value.strip()
+    if not value:
+        raise InvalidTarget('Boş hedef')
+
+    if '://' not in value:
+        value = '//' + value
+    try:
+        host = urlsplit(value).hostname
+    except ValueError:
+        raise InvalidTarget('Geçersiz hedef')
+    if not host:
+        raise InvalidTarget('Geçersiz hedef')
+
+    ip = _parse_ip(host)
+    if ip is not None:
+        return str(ip)
+
+    host = host.rstrip('.')
+    try:
+        host = idna.encode(host, uts46=True).decode('ascii')
+    except idna.IDNAError:
+        raise InvalidTarget('Geçersiz domain')
+    # '-' ile başlayan etiketler araç komut satırında seçenek olarak yorumlanabilir
+    if '.' not in host or any(label.startswith('-') for label in host.split('.')):
+        raise InvalidTarget('Geçersiz domain')
+    return host
+
+
+def canonicalize_url(value):
+    """
+    http(s) URL'sini şema/host küçük harfli, varsayılan port ve fragment'sız hale getirir
+    """
+    value = value.strip()
+    try:
+        parts = urlsplit(value)
+        port = parts.port
+    except ValueError:
+        raise InvalidTarget('Geçersiz URL')
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        raise InvalidTarget('Geçersiz URL')
+
+    ip = _parse_ip(parts.hostname)
+    if ip is None:
+        host = canonicalize_host(parts.hostname)
+    elif ip.version == 6:
+        host = f'[{ip}]'
+    else:
+        host = str(ip)
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f'{host}:{port}'
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+def canonicalize_network(value):
+    """
+    CIDR gösterimindeki ağı kanonik hale getirir (örn. 10.0.0.1/24 -> 10.0.0.0/24)
+    """
+    try:
+        return str(ipaddress.ip_network(value.strip(), strict=False))
+    except ValueError:
+        raise InvalidTarget('Geçersiz ağ adresi')
+
+
+def host_of(canonical):
+    if '://' in canonical:
+        return urlsplit(canonical).hostname
+    return canonical.split('/')[0]
+
+
+def canonicalize(task_type, value, resolve=True):
+    """
+    Görev tipine göre hedefi kanonik hale getirir ve (kanonik hedef, tekilleştirme anahtarı) döndürür.
+    resolve=True ise domain'ler DNS önbelleği üzerinden çözümlenir ve çözümlenemeyenler reddedilir.
+    """
+    if not isinstance(value, str):
+        raise InvalidTarget('Geçersiz hedef')
+
+    if task_type == 'run_katana':
+        canonical = canonicalize_url(value)
+    elif task_type == 'run_nmap' and '/' in value and _parse_ip(value.split('/')[0].strip()) is not None:
+        canonical = canonicalize_network(value)
+    elif task_type in ('run_nmap', 'whois_lookup'):
+        canonical = canonicalize_host(value)
+    else:
+        raise InvalidTarget('Geçersiz görev tipi')
+
+    # WHOIS kayıt bilgisini sorgular; A/AAAA kaydı olmayan domain'ler de geçerlidir
+    host = host_of(canonical)
+    if resolve and task_type != 'whois_lookup' and _parse_ip(host) is None and not dns_cache.resolve(host):
+        raise UnresolvableTarget('Hedef çözümlenemedi')
+
+    return canonical, f'{task_type}:{canonical}'